@@ -230,7 +230,9 @@ export async function registerRoutes(app: Express): Promise<Server> {
       
       // Prepare the input data for the Python script
       const inputData = {
-        csvData: filesContent
+        csvData: filesContent,
+        // Optional seed so identical uploads produce identical timetables
+        seed: req.body.seed !== undefined && req.body.seed !== "" ? Number(req.body.seed) : undefined
       };
       
       let resultData = "";
@@ -283,7 +285,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
           if (result.status === "success" && result.timetable && Array.isArray(result.timetable)) {
             const timetableName = `Generated CSV Timetable ${new Date().toLocaleString()}`;
             
-            storage.saveTimetable(timetableName, result.timetable, req.user.id)
+            storage.saveTimetable(timetableName, result.timetable, req.user.id, result.indexes)
               .then(savedTimetable => {
                 // Include the saved timetable info in the response
                 result.savedTimetable = {
@@ -408,6 +410,197 @@ export async function registerRoutes(app: Express): Promise<Server> {
       });
   });
 
+  // Per-entity views over a saved timetable using its precomputed indexes,
+  // e.g. ?student=S014, ?faculty=F003, ?room=R104, ?course=CSE101 or ?slot=Tuesday 10:00-11:00
+  app.get("/api/timetables/:id/query", (req, res) => {
+    if (!req.isAuthenticated()) {
+      return res.status(401).json({ message: "Authentication required" });
+    }
+    
+    storage.getTimetableById(req.params.id)
+      .then(timetable => {
+        if (!timetable) {
+          return res.status(404).json({ message: "Timetable not found" });
+        }
+        
+        // If user is faculty, ensure they own the timetable
+        if (req.user.userType === "faculty" && timetable.createdBy !== req.user.id) {
+          return res.status(403).json({ message: "Access denied. You don't have permission to view this timetable." });
+        }
+        
+        if (!timetable.indexes) {
+          return res.status(404).json({ message: "This timetable has no precomputed indexes" });
+        }
+        
+        const indexes = timetable.indexes;
+        const lookups = {
+          student: indexes.byStudent,
+          faculty: indexes.byFaculty,
+          room: indexes.byRoom,
+          course: indexes.byCourse,
+          slot: indexes.bySlot
+        };
+        const key = (Object.keys(lookups) as (keyof typeof lookups)[])
+          .find(name => typeof req.query[name] === "string");
+        
+        if (!key) {
+          return res.status(400).json({ 
+            message: "One of student, faculty, room, course or slot is required" 
+          });
+        }
+        
+        // Only own keys count, so ids like "constructor" or "__proto__" match nothing
+        const value = req.query[key] as string;
+        const positions = Object.hasOwn(lookups[key], value) ? lookups[key][value] : [];
+        res.json(positions.map(position => timetable.timetableData[position]));
+      })
+      .catch(error => {
+        res.status(500).json({ 
+          message: "Failed to fetch timetable", 
+          error: error.message 
+        });
+      });
+  });
+  
+  // Rooms that are free in a given slot, from the per-room free-slot bitmaps
+  app.get("/api/timetables/:id/free-rooms", (req, res) => {
+    if (!req.isAuthenticated()) {
+      return res.status(401).json({ message: "Authentication required" });
+    }
+    
+    const slot = req.query.slot;
+    
+    if (typeof slot !== "string") {
+      return res.status(400).json({ message: "A slot such as 'Tuesday 10:00-11:00' is required" });
+    }
+    
+    storage.getTimetableById(req.params.id)
+      .then(timetable => {
+        if (!timetable) {
+          return res.status(404).json({ message: "Timetable not found" });
+        }
+        
+        // If user is faculty, ensure they own the timetable
+        if (req.user.userType === "faculty" && timetable.createdBy !== req.user.id) {
+          return res.status(403).json({ message: "Access denied. You don't have permission to view this timetable." });
+        }
+        
+        if (!timetable.indexes) {
+          return res.status(404).json({ message: "This timetable has no precomputed indexes" });
+        }
+        
+        const position = timetable.indexes.slots.indexOf(slot);
+        
+        if (position === -1) {
+          return res.status(400).json({ message: `Unknown slot: ${slot}` });
+        }
+        
+        const freeRooms = Object.entries(timetable.indexes.freeSlotBitmaps)
+          .filter(([, bitmap]) => bitmap[position] === "1")
+          .map(([roomId]) => roomId);
+        
+        res.json({ slot, freeRooms });
+      })
+      .catch(error => {
+        res.status(500).json({ 
+          message: "Failed to fetch timetable", 
+          error: error.message 
+        });
+      });
+  });
+
+  // What-if scenario evaluation against a saved timetable
+  app.post("/api/timetables/:id/what-if", (req, res) => {
+    if (!req.isAuthenticated()) {
+      return res.status(401).json({ message: "Authentication required" });
+    }
+    
+    // Check if user is faculty
+    if (req.user?.userType !== "faculty") {
+      return res.status(403).json({ 
+        message: "Access denied. Scenario evaluation is available only for faculty members." 
+      });
+    }
+    
+    const { deltas, courses, faculty, rooms, students } = req.body;
+    
+    if (!deltas || !Array.isArray(deltas)) {
+      return res.status(400).json({ 
+        message: "Invalid scenario. A deltas array is required." 
+      });
+    }
+    
+    storage.getTimetableById(req.params.id)
+      .then(timetable => {
+        if (!timetable) {
+          return res.status(404).json({ message: "Timetable not found" });
+        }
+        
+        if (timetable.createdBy !== req.user.id) {
+          return res.status(403).json({ message: "Access denied. You don't have permission to modify this timetable." });
+        }
+        
+        // Execute the Python script as a separate process
+        const pythonProcess = spawn("python3", ["./server/timetable-generator.py"]);
+        
+        // Only the affected sessions are re-placed; the result lists changed entries
+        const inputData = {
+          courses: courses || [],
+          faculty: faculty || [],
+          rooms: rooms || [],
+          students: students || [],
+          scenario: {
+            baseTimetable: timetable.timetableData,
+            deltas
+          }
+        };
+        
+        let resultData = "";
+        let errorData = "";
+        
+        pythonProcess.stdin.write(JSON.stringify(inputData));
+        pythonProcess.stdin.end();
+        
+        pythonProcess.stdout.on("data", (data) => {
+          resultData += data.toString();
+        });
+        
+        pythonProcess.stderr.on("data", (data) => {
+          errorData += data.toString();
+          console.error("Python process error:", data.toString());
+        });
+        
+        pythonProcess.on("close", (code) => {
+          if (code !== 0) {
+            console.error(`Error: ${errorData}`);
+            return res.status(500).json({ 
+              status: "error", 
+              message: "Error evaluating scenario", 
+              error: errorData 
+            });
+          }
+          
+          try {
+            // Parse the output from Python - use only the last line which should contain the JSON
+            const lines = resultData.trim().split('\n');
+            res.json(JSON.parse(lines[lines.length - 1]));
+          } catch (e) {
+            console.error("Error parsing Python output:", e);
+            res.status(500).json({ 
+              status: "error", 
+              message: "Error processing scenario result" 
+            });
+          }
+        });
+      })
+      .catch(error => {
+        res.status(500).json({ 
+          message: "Failed to fetch timetable", 
+          error: error.message 
+        });
+      });
+  });
+
   // Timetable Generation API endpoint (non-CSV version)
   app.post("/api/generate-timetable", (req, res) => {
     if (!req.isAuthenticated()) {
@@ -473,7 +666,7 @@ export async function registerRoutes(app: Express): Promise<Server> {
         if (result.status === "success" && result.timetable && Array.isArray(result.timetable)) {
           const timetableName = `Generated Timetable ${new Date().toLocaleString()}`;
           
-          storage.saveTimetable(timetableName, result.timetable, req.user.id)
+          storage.saveTimetable(timetableName, result.timetable, req.user.id, result.indexes)
             .then(savedTimetable => {
               // Include the saved timetable info in the response
               result.savedTimetable = {
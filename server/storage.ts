@@ -32,6 +32,18 @@ type Task = {
   createdAt: Date;
 };
 
+// Secondary indexes emitted by the timetable generator alongside the timetable.
+// The by* maps point at positions in timetableData.
+export type TimetableIndexes = {
+  slots: string[];
+  byFaculty: Record<string, number[]>;
+  byRoom: Record<string, number[]>;
+  byCourse: Record<string, number[]>;
+  bySlot: Record<string, number[]>;
+  byStudent: Record<string, number[]>;
+  freeSlotBitmaps: Record<string, string>; // One '1'/'0' per slot, '1' = free
+};
+
 // Define a timetable entry type
 type TimetableEntry = {
   id: string;
@@ -39,6 +51,7 @@ type TimetableEntry = {
   createdAt: Date;
   createdBy: number; // userId of faculty who created it
   timetableData: any[]; // The timetable JSON data
+  indexes?: TimetableIndexes; // Present when the timetable came from the generator
 };
 
 export interface IStorage {
@@ -53,7 +66,7 @@ export interface IStorage {
   updateTask(task: Task): Task;
   deleteTask(id: string): void;
   // Timetable storage methods
-  saveTimetable(name: string, data: any[], userId: number): Promise<TimetableEntry>;
+  saveTimetable(name: string, data: any[], userId: number, indexes?: TimetableIndexes): Promise<TimetableEntry>;
   getAllTimetables(): Promise<TimetableEntry[]>;
   getTimetableById(id: string): Promise<TimetableEntry | undefined>;
   getTimetablesByFaculty(facultyId: number): Promise<TimetableEntry[]>;
@@ -153,14 +166,15 @@ export class MemStorage implements IStorage {
   }
 
   // Timetable methods
-  async saveTimetable(name: string, data: any[], userId: number): Promise<TimetableEntry> {
+  async saveTimetable(name: string, data: any[], userId: number, indexes?: TimetableIndexes): Promise<TimetableEntry> {
     const id = `timetable_${Date.now()}`;
     const timetableEntry: TimetableEntry = {
       id,
       name,
       createdAt: new Date(),
       createdBy: userId,
-      timetableData: data
+      timetableData: data,
+      indexes
     };
     
     this.timetables.set(id, timetableEntry);
@@ -1,9 +1,253 @@
+import csv
+import io
 import json
+import logging
+import logging.handlers
+import os
+import resource
 import sys
 import pandas as pd
 from ortools.sat.python import cp_model
 import random
+import time
 import numpy as np
+from multiprocessing import Pool, shared_memory
+
+# Accepted GA options as (type, lowest, highest); values are clamped to range
+GA_OPTION_LIMITS = {
+    'max_generations': (int, 1, 5000),
+    'stagnation_limit': (int, 1, 1000),
+    'target_penalty': (float, 0, float("inf")),
+    'time_limit': (float, 0.1, 120),
+    'workers': (int, 1, os.cpu_count() or 1),
+    'memory_limit_mb': (float, 1, float("inf"))
+}
+
+# CP-SAT search workers, the same for seeded and unseeded runs
+CPSAT_WORKERS = 8
+
+# Upper bound on GA wall-clock time, whether or not a time_limit is given
+GA_MAX_SECONDS = 120
+
+# Approximate memory CP-SAT needs per != constraint (model plus solver)
+CONSTRAINT_BYTES = 1024
+
+def current_rss_mb():
+    """
+    Resident set size of this process in megabytes
+    
+    Returns:
+        Current RSS from /proc, or the peak RSS where /proc is unavailable
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class BoundedDebugLog(io.TextIOBase):
+    """Text stream that keeps at most max_chars of debug output in memory"""
+    
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.parts = []
+        self.size = 0
+        self.dropped = 0
+    
+    def write(self, text):
+        room = self.max_chars - self.size
+        if room > 0:
+            kept = text[:room]
+            self.parts.append(kept)
+            self.size += len(kept)
+        self.dropped += max(0, len(text) - max(room, 0))
+        return len(text)
+    
+    def getvalue(self):
+        value = "".join(self.parts)
+        if self.dropped:
+            value += f"\n... {self.dropped} characters of debug output dropped"
+        return value
+
+class RotatingDebugLog(io.TextIOBase):
+    """Text stream that writes debug output to a size-capped rotating file"""
+    
+    def __init__(self, path, max_bytes, backup_count=3):
+        self.path = path
+        self.handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count
+        )
+        # print() supplies its own newlines
+        self.handler.terminator = ""
+    
+    def write(self, text):
+        self.handler.emit(logging.makeLogRecord({"msg": text, "levelno": logging.DEBUG}))
+        return len(text)
+    
+    def getvalue(self):
+        self.handler.close()
+        return f"Debug output written to {self.path}"
+
+def load_json_stream(stream, chunk_size=1 << 16):
+    """
+    Parse JSON from a text stream without reading all of it up front
+    
+    Objects are parsed member by member (recursively), so consumed input is
+    released as parsing goes. Any other value, such as one CSV file's
+    contents or a timetable array, is still buffered whole while it is
+    decoded.
+    
+    Args:
+        stream: Text stream positioned at the start of a JSON document
+        chunk_size: Number of characters read at a time
+    
+    Returns:
+        The decoded JSON value
+    """
+    decoder = json.JSONDecoder()
+    state = {"buffer": "", "pos": 0, "eof": False}
+    
+    def fill(min_length=0):
+        """Read more input; returns False once the stream is exhausted"""
+        if state["eof"]:
+            return False
+        # Drop consumed input before growing the buffer
+        if state["pos"]:
+            state["buffer"] = state["buffer"][state["pos"]:]
+            state["pos"] = 0
+        target = max(len(state["buffer"]) + chunk_size, min_length)
+        parts = [state["buffer"]]
+        length = len(state["buffer"])
+        while length < target:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                state["eof"] = True
+                break
+            parts.append(chunk)
+            length += len(chunk)
+        state["buffer"] = "".join(parts)
+        return length > 0
+    
+    def peek():
+        """Skip whitespace and return the next character ('' at the end)"""
+        while True:
+            buffer, pos = state["buffer"], state["pos"]
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            state["pos"] = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                return ""
+    
+    def expect(char):
+        if peek() != char:
+            raise ValueError(f"Invalid JSON input: expected '{char}'")
+        state["pos"] += 1
+    
+    def parse_scalar():
+        while True:
+            try:
+                value, end = decoder.raw_decode(state["buffer"], state["pos"])
+            except json.JSONDecodeError:
+                value, end = None, None
+            # A value is only complete once a delimiter follows it; "12." at
+            # the buffer edge decodes as 12, so read more unless at the end
+            complete = end is not None and (
+                state["eof"]
+                or (end < len(state["buffer"]) and state["buffer"][end] in ",}] \t\r\n")
+            )
+            if complete:
+                state["pos"] = end
+                return value
+            # Double the buffer so re-decoding stays linear overall
+            pending = len(state["buffer"]) - state["pos"]
+            if not fill(2 * pending):
+                if end is not None:
+                    state["pos"] = end
+                    return value
+                raise ValueError("Invalid JSON input: unexpected end of data")
+    
+    def parse_value():
+        if peek() != "{":
+            return parse_scalar()
+        state["pos"] += 1
+        result = {}
+        if peek() == "}":
+            state["pos"] += 1
+            return result
+        while True:
+            if peek() != '"':
+                raise ValueError("Invalid JSON input: expected an object key")
+            key = parse_scalar()
+            expect(":")
+            result[key] = parse_value()
+            if peek() == ",":
+                state["pos"] += 1
+                continue
+            expect("}")
+            return result
+    
+    value = parse_value()
+    if peek() != "":
+        raise ValueError("Invalid JSON input: extra data after document")
+    return value
+
+def derive_seed(seed, *labels):
+    """
+    Derive a stable child seed for a named stage or worker
+    
+    Args:
+        seed: Base seed for the run, or None for a non-deterministic run
+        labels: Stage name and/or worker index the seed is derived for
+    
+    Returns:
+        A 32-bit integer seed, or None if no base seed was given
+    """
+    if seed is None:
+        return None
+    
+    # Seeding Random with a string is stable across processes (unlike hash())
+    key = ":".join(str(part) for part in (seed,) + labels)
+    return random.Random(key).getrandbits(32)
+
+def build_enrollment_index(students):
+    """
+    Count enrolled students per course
+    
+    Args:
+        students: List of students as produced by parse_csv_data
+    
+    Returns:
+        Dictionary mapping course ID to headcount
+    """
+    counts = {}
+    for student in students:
+        for course_id in set(student.get('enrolledCourses', [])):
+            counts[course_id] = counts.get(course_id, 0) + 1
+    return counts
+
+def room_capacities(rooms):
+    """
+    Map room IDs to integer capacities
+    
+    Args:
+        rooms: Rooms DataFrame
+    
+    Returns:
+        Dictionary mapping room ID to capacity (rooms without a usable
+        capacity are left out)
+    """
+    if rooms.empty or "id" not in rooms.columns or "capacity" not in rooms.columns:
+        return {}
+    capacity = pd.to_numeric(rooms["capacity"], errors="coerce")
+    return {
+        room_id: int(value)
+        for room_id, value in zip(rooms["id"], capacity)
+        if not pd.isna(value)
+    }
 
 def generate_timetable(input_data):
     """
@@ -19,11 +263,43 @@ def generate_timetable(input_data):
             - students: List of students
             - use_provided_timetable: Whether to use provided timetable
             - provided_timetable: Provided timetable data
+            - seed: Optional integer seed; the same seed and input always
+              produce the same timetable
+            - max_generations, stagnation_limit, target_penalty, time_limit:
+              Optional GA termination controls
+            - workers: Optional number of processes for fitness evaluation
+            - memory_limit_mb: Optional RSS budget; the solver degrades
+              (smaller GA population, no soft constraints) to stay under it
+            - scenario: Optional what-if request; see evaluate_scenario
     
     Returns:
         An optimized timetable
     """
+    # What-if questions repair an existing timetable instead of regenerating
+    if input_data.get('scenario'):
+        return evaluate_scenario(input_data)
+    
     try:
+        started = time.monotonic()
+        
+        # Every stage draws from its own generator derived from the run seed
+        seed = input_data.get('seed')
+        if seed is not None:
+            seed = int(seed)
+        
+        # Optional GA controls (see genetic_algorithm_optimize); they come from
+        # the request body, so coerce and clamp them to sane ranges
+        ga_options = {}
+        for key, (convert, lowest, highest) in GA_OPTION_LIMITS.items():
+            if input_data.get(key) is None:
+                continue
+            try:
+                value = convert(input_data[key])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {key}: {input_data[key]!r}")
+            ga_options[key] = min(max(value, lowest), highest)
+        memory_limit_mb = ga_options.get('memory_limit_mb')
+        
         # Check if we should use provided timetable format directly
         if input_data.get('use_provided_timetable', False) and 'provided_timetable' in input_data:
             print("Using provided timetable format")
@@ -102,7 +378,10 @@ def generate_timetable(input_data):
             return {
                 "status": "success",
                 "message": "Timetable generated successfully from provided format",
-                "timetable": timetable_results
+                "timetable": timetable_results,
+                "indexes": build_timetable_index(
+                    timetable_results, input_data.get('rooms', []), input_data.get('students', [])
+                )
             }
         
         # Extract data from input for normal generation
@@ -111,18 +390,21 @@ def generate_timetable(input_data):
         rooms_data = input_data.get('rooms', [])
         lectures_data = input_data.get('lectures', [])
         labs_data = input_data.get('labs', [])
+        enrollment_counts = build_enrollment_index(input_data.get('students', []))
         
-        print(f"Received courses_data: {courses_data}")
-        print(f"Received faculty_data: {faculty_data}")
-        print(f"Received rooms_data: {rooms_data}")
-        print(f"Received lectures_data: {lectures_data}")
-        print(f"Received labs_data: {labs_data}")
+        # Log sizes only; dumping full inputs grows with the term size
+        print(f"Received {len(courses_data)} courses, {len(faculty_data)} faculty, "
+              f"{len(rooms_data)} rooms, {len(lectures_data)} lectures, {len(labs_data)} labs")
         
         # Create a timetable based on the provided CSV files
         # This approach uses the lectures.csv and labs.csv directly
         if lectures_data or labs_data:
             print("Generating timetable from lectures and labs CSV data")
+            # Rooms come from the CSV as-is; capacity is only checked and
+            # reported (optimization.capacityViolations), never reassigned
             timetable_results = []
+            optimization_info = None
+            allocation_rng = random.Random(derive_seed(seed, "allocation"))
             
             # Process lectures
             for lecture in lectures_data:
@@ -154,7 +436,7 @@ def generate_timetable(input_data):
                 # Assign a time slot (simplified allocation)
                 day_options = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
                 time_options = ["9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00", "14:00-15:00", "15:00-16:00"]
-                time_slot = f"{random.choice(day_options)} {random.choice(time_options)}"
+                time_slot = f"{allocation_rng.choice(day_options)} {allocation_rng.choice(time_options)}"
                 
                 timetable_results.append({
                     "courseId": course_id,
@@ -197,7 +479,7 @@ def generate_timetable(input_data):
                 # Assign a time slot (simplified allocation)
                 day_options = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
                 time_options = ["9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00", "14:00-15:00", "15:00-16:00"]
-                time_slot = f"{random.choice(day_options)} {random.choice(time_options)}"
+                time_slot = f"{allocation_rng.choice(day_options)} {allocation_rng.choice(time_options)}"
                 
                 timetable_results.append({
                     "courseId": course_id,
@@ -223,7 +505,12 @@ def generate_timetable(input_data):
                     time_slots = ["9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00", "14:00-15:00", "15:00-16:00"]
                     available_slots = [f"{day} {slot}" for day in days for slot in time_slots]
                     
-                    optimized_schedule = genetic_algorithm_optimize(timetable_results, faculty, rooms, available_slots)
+                    optimized_schedule, optimization_info = genetic_algorithm_optimize(
+                        timetable_results, faculty, rooms, available_slots,
+                        seed=derive_seed(seed, "ga"),
+                        enrollment_counts=enrollment_counts,
+                        **ga_options
+                    )
                     timetable_results = optimized_schedule
                 except Exception as opt_error:
                     print(f"Error during optimization: {str(opt_error)}")
@@ -232,7 +519,15 @@ def generate_timetable(input_data):
             return {
                 "status": "success",
                 "message": "Timetable generated successfully from CSV data",
-                "timetable": timetable_results
+                "timetable": timetable_results,
+                "seed": seed,
+                "optimization": optimization_info,
+                # Wall-clock time varies between identical runs; leave it out
+                # of cache keys and result comparisons
+                "timing": {"elapsedSeconds": round(time.monotonic() - started, 3)},
+                "indexes": build_timetable_index(
+                    timetable_results, rooms_data, input_data.get('students', [])
+                )
             }
         
         # Standard timetable generation using CP-SAT and GA if no direct data is available
@@ -308,6 +603,7 @@ def generate_timetable(input_data):
         # CSP Model Initialization
         model = cp_model.CpModel()
         time_table = {}
+        assignment_rng = random.Random(derive_seed(seed, "assignment"))
         
         # Assign faculty and rooms based on lectures/labs data if available
         faculty_assignments = {}
@@ -325,6 +621,16 @@ def generate_timetable(input_data):
             if course_id and room_id:
                 room_assignments[course_id] = room_id
         
+        # Room domains per session type, pruned per course to rooms that can
+        # seat its enrolled students
+        capacities = room_capacities(rooms)
+        rooms_by_type = {}
+        for room_type in ("Lab", "Lecture"):
+            rooms_by_type[room_type] = rooms[rooms.get("type", "Lecture") == room_type]["id"].tolist()
+            if not rooms_by_type[room_type]:  # Fallback to all rooms if none of this type
+                rooms_by_type[room_type] = rooms["id"].tolist()
+        room_domains = {}
+        
         # Assign faculty and rooms
         for i, row in sessions_df.iterrows():
             course_id = row["courseId"]
@@ -335,23 +641,28 @@ def generate_timetable(input_data):
                 faculty_id = faculty_assignments[course_id]
             else:
                 eligible_faculty = faculty["id"].tolist()
-                faculty_id = random.choice(eligible_faculty) if eligible_faculty else None
+                faculty_id = assignment_rng.choice(eligible_faculty) if eligible_faculty else None
             
             # Select room based on assignments or randomly
             if course_id in room_assignments:
                 room_id = room_assignments[course_id]
             else:
                 # For random selection, prefer rooms of appropriate type
-                if session_type == "Lab":
-                    eligible_rooms = rooms[rooms.get("type", "Lecture") == "Lab"]["id"].tolist()
-                    if not eligible_rooms:  # Fallback to all rooms if no labs
-                        eligible_rooms = rooms["id"].tolist()
-                else:
-                    eligible_rooms = rooms[rooms.get("type", "Lecture") == "Lecture"]["id"].tolist()
-                    if not eligible_rooms:  # Fallback to all rooms if no lecture rooms
-                        eligible_rooms = rooms["id"].tolist()
+                # that are large enough for the course
+                domain_key = (course_id, "Lab" if session_type == "Lab" else "Lecture")
+                if domain_key not in room_domains:
+                    eligible_rooms = rooms_by_type[domain_key[1]]
+                    headcount = enrollment_counts.get(course_id, 0)
+                    if headcount and capacities:
+                        fitting = [r for r in eligible_rooms if capacities.get(r, 0) >= headcount]
+                        if not fitting and eligible_rooms:
+                            # Nothing is big enough; use the largest room available
+                            fitting = [max(eligible_rooms, key=lambda r: capacities.get(r, 0))]
+                        eligible_rooms = fitting
+                    room_domains[domain_key] = eligible_rooms
+                eligible_rooms = room_domains[domain_key]
                 
-                room_id = random.choice(eligible_rooms) if eligible_rooms else None
+                room_id = assignment_rng.choice(eligible_rooms) if eligible_rooms else None
             
             # Create variable for this session
             var = model.NewIntVar(0, len(available_slots) - 1, f"slot_{course_id}_{i}")
@@ -384,23 +695,53 @@ def generate_timetable(input_data):
                     course_to_var[course_id] = []
                 course_to_var[course_id].append(var)
             
-            # Add constraints for each student's enrolled courses
+            # Collect the session pairs each student's courses must keep apart;
+            # students with overlapping enrollments share pairs, so dedupe them
+            student_pairs = set()
             for student in student_data:
                 enrolled_courses = student.get('enrolledCourses', [])
                 # Get all variables for this student's courses
                 student_vars = []
-                for course_id in enrolled_courses:
+                for course_id in dict.fromkeys(enrolled_courses):
                     if course_id in course_to_var:
                         student_vars.extend(course_to_var[course_id])
                 
-                # No two courses for this student should be at the same time
                 for i, var1 in enumerate(student_vars):
-                    for j, var2 in enumerate(student_vars):
-                        if i < j:
-                            model.Add(var1 != var2)
+                    for var2 in student_vars[i + 1:]:
+                        student_pairs.add((var1.Index(), var2.Index()) if var1.Index() < var2.Index()
+                                          else (var2.Index(), var1.Index()))
+            
+            # Building and solving costs roughly 1 KB per != constraint. Student
+            # clashes are hard constraints, so refuse rather than drop them or
+            # exceed the memory budget
+            if memory_limit_mb:
+                headroom_mb = memory_limit_mb - current_rss_mb()
+                needed_mb = len(student_pairs) * CONSTRAINT_BYTES / 2 ** 20
+                if needed_mb > 0.5 * headroom_mb:
+                    return {
+                        "status": "error",
+                        "message": f"Memory budget too small: {len(student_pairs)} student constraints "
+                                   f"need about {needed_mb:.0f} MB but only {max(headroom_mb, 0):.0f} MB "
+                                   f"is available",
+                        "timetable": []
+                    }
+            
+            # No two courses for a student should be at the same time
+            variables = {var.Index(): var for vars_ in course_to_var.values() for var in vars_}
+            for index1, index2 in sorted(student_pairs):
+                model.Add(variables[index1] != variables[index2])
         
         # Solve CSP model
         solver = cp_model.CpSolver()
+        # Seeded and unseeded runs use the same fixed worker portfolio; seeded
+        # runs interleave the workers deterministically so results repeat
+        solver.parameters.num_workers = CPSAT_WORKERS
+        if seed is not None:
+            solver.parameters.random_seed = derive_seed(seed, "cpsat") % (2 ** 31)
+            solver.parameters.interleave_search = True
+        if memory_limit_mb:
+            # CP-SAT only gets what is left after imports, input and the model
+            solver.parameters.max_memory_in_mb = max(1, int(memory_limit_mb - current_rss_mb()))
         status = solver.Solve(model)
         
         # Process results
@@ -436,13 +777,27 @@ def generate_timetable(input_data):
                 })
         
             # Genetic Algorithm Optimization
-            optimized_schedule = genetic_algorithm_optimize(timetable_results, faculty, rooms, available_slots)
+            optimized_schedule, optimization_info = genetic_algorithm_optimize(
+                timetable_results, faculty, rooms, available_slots,
+                seed=derive_seed(seed, "ga"),
+                enrollment_counts=enrollment_counts,
+                **ga_options
+            )
             
             # Format and return the result
             return {
                 "status": "success",
                 "message": "Timetable generated successfully",
-                "timetable": optimized_schedule
+                "timetable": optimized_schedule,
+                "seed": seed,
+                "solver": {"workers": CPSAT_WORKERS, "deterministic": seed is not None},
+                "optimization": optimization_info,
+                # Wall-clock time varies between identical runs; leave it out
+                # of cache keys and result comparisons
+                "timing": {"elapsedSeconds": round(time.monotonic() - started, 3)},
+                "indexes": build_timetable_index(
+                    optimized_schedule, rooms_data, input_data.get('students', [])
+                )
             }
         else:
             # If CSP solver couldn't find a solution, return empty timetable
@@ -458,124 +813,660 @@ def generate_timetable(input_data):
             "message": f"Error generating timetable: {str(e)}"
         }
 
-def genetic_algorithm_optimize(initial_schedule, faculty, rooms, available_slots):
+def build_fitness_model(schedule, slots, capacities=None, enrollment_counts=None):
+    """
+    Precompute the arrays needed to score schedules in batch
+    
+    Only time slots change during optimization, so every pairwise check in
+    the fitness function can be reduced to a list of session pairs that
+    share a faculty member or a room, plus a slot-by-slot lookup table.
+    
+    Args:
+        schedule: List of session dicts (faculty and room are fixed)
+        slots: List of time slot strings, indexed by slot number
+        capacities: Optional mapping of room ID to capacity
+        enrollment_counts: Optional mapping of course ID to headcount
+    
+    Returns:
+        Dictionary of NumPy arrays used by batch_fitness
+    """
+    capacities = capacities or {}
+    enrollment_counts = enrollment_counts or {}
+    def same_value_pairs(key):
+        groups = {}
+        for idx, session in enumerate(schedule):
+            groups.setdefault(session[key], []).append(idx)
+        first, second = [], []
+        for members in groups.values():
+            if len(members) > 1:
+                members = np.array(members)
+                i, j = np.triu_indices(len(members), k=1)
+                first.append(members[i])
+                second.append(members[j])
+        if not first:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        return np.concatenate(first), np.concatenate(second)
+    
+    def consecutive(slot1, slot2):
+        # Same comparison the per-schedule fitness used: same day and the
+        # earlier (string-sorted) slot ends where the later one starts
+        day1, time1 = slot1.split(" ", 1)
+        day2, time2 = slot2.split(" ", 1)
+        if day1 != day2:
+            return False
+        times = sorted([time1, time2])
+        return times[0].split("-")[1] == times[1].split("-")[0]
+    
+    faculty_first, faculty_second = same_value_pairs("facultyId")
+    room_first, room_second = same_value_pairs("roomId")
+    
+    # Consecutive slots are counted once for each ordering of the pair
+    adjacency = np.array(
+        [[2 * consecutive(a, b) for b in slots] for a in slots],
+        dtype=np.int64
+    ).reshape(len(slots), len(slots))
+    
+    # Rooms stay fixed during optimization, so capacity violations are the
+    # same for every individual; they are reported, not scored
+    capacity_violations = sum(
+        1
+        for session in schedule
+        if session.get("roomId") in capacities
+        and enrollment_counts.get(session.get("courseId"), 0) > capacities[session.get("roomId")]
+    )
+    
+    return {
+        "faculty_first": faculty_first,
+        "faculty_second": faculty_second,
+        "room_first": room_first,
+        "room_second": room_second,
+        "adjacency": adjacency,
+        "capacity_violations": capacity_violations
+    }
+
+def batch_fitness(population, model):
+    """
+    Score a whole population at once (higher is better)
+    
+    Args:
+        population: Integer array of shape (population size, sessions)
+            holding the slot index of each session
+        model: Output of build_fitness_model
+    
+    Returns:
+        Array of fitness scores, one per individual
+    """
+    faculty_first = population[:, model["faculty_first"]]
+    faculty_second = population[:, model["faculty_second"]]
+    room_first = population[:, model["room_first"]]
+    room_second = population[:, model["room_second"]]
+    
+    # Same faculty or same room in the same slot
+    penalty = 10 * np.count_nonzero(faculty_first == faculty_second, axis=1)
+    penalty += 10 * np.count_nonzero(room_first == room_second, axis=1)
+    
+    # Back-to-back slots for the same faculty (small penalty); skipped when
+    # soft constraints were dropped to save memory
+    if model.get("soft_constraints", True):
+        penalty += model["adjacency"][faculty_first, faculty_second].sum(axis=1)
+    
+    return -penalty
+
+# Fitness model and shared buffers of a fitness worker process
+_worker_state = {}
+
+def _init_fitness_worker(model, population_name, scores_name, shape):
+    """Attach a worker process to the shared population and score buffers"""
+    population_shm = shared_memory.SharedMemory(name=population_name)
+    scores_shm = shared_memory.SharedMemory(name=scores_name)
+    _worker_state["model"] = model
+    _worker_state["buffers"] = (population_shm, scores_shm)
+    _worker_state["population"] = np.ndarray(shape, dtype=np.int64, buffer=population_shm.buf)
+    _worker_state["scores"] = np.ndarray(shape[0], dtype=np.int64, buffer=scores_shm.buf)
+
+def _score_shard(bounds):
+    """Score rows [start, end) of the shared population in place"""
+    start, end = bounds
+    population = _worker_state["population"]
+    _worker_state["scores"][start:end] = batch_fitness(population[start:end], _worker_state["model"])
+
+def genetic_algorithm_optimize(initial_schedule, faculty, rooms, available_slots, seed=None,
+                               max_generations=500, stagnation_limit=20, target_penalty=0,
+                               time_limit=None, workers=1, enrollment_counts=None,
+                               memory_limit_mb=None):
     """
     Optimize the initial schedule using genetic algorithm
     
+    The population is held as a (population x sessions) array of slot
+    indices and scored in one batch per generation. With workers > 1 the
+    array lives in shared memory and each worker process scores a shard of
+    rows, so no schedules are pickled between processes.
+    
+    The population is sized from the number of sessions and the mutation
+    rate follows population diversity. The run stops at the first of:
+    no improvement for stagnation_limit generations, a best penalty at or
+    below target_penalty, time_limit seconds elapsed, or max_generations.
+    
+    With memory_limit_mb set, the population and the scoring batch are sized
+    to fit the remaining budget, the faculty back-to-back soft constraint is
+    dropped if the population had to shrink, and the run stops early if RSS
+    gets close to the limit.
+    
     Args:
         initial_schedule: Initial schedule from CSP
         faculty: Faculty DataFrame
         rooms: Rooms DataFrame
         available_slots: List of available time slots
+        seed: Optional seed for the GA's random generator
+        max_generations: Upper bound on generations
+        stagnation_limit: Generations without improvement before stopping
+        target_penalty: Stop once the best penalty reaches this value
+        time_limit: Optional wall-clock budget in seconds (capped at GA_MAX_SECONDS)
+        workers: Number of processes used to score the population
+        enrollment_counts: Optional mapping of course ID to headcount, used
+            to report sessions in rooms that are too small
+        memory_limit_mb: Optional RSS budget for the process in megabytes
     
     Returns:
-        Optimized schedule
+        Tuple of (optimized schedule, dict describing the run)
     """
+    rng = np.random.default_rng(seed)
+    start_time = time.monotonic()
+    
+    # Worker count comes from request input; never fork more than the CPUs
+    workers = min(max(1, int(workers)), os.cpu_count() or 1)
+    time_limit = GA_MAX_SECONDS if time_limit is None else min(float(time_limit), GA_MAX_SECONDS)
+    
     # Parameters
-    POPULATION_SIZE = 30
-    GENERATIONS = 50
-    MUTATION_RATE = 0.1
-    
-    def fitness(schedule):
-        """Calculate fitness score (lower is better)"""
-        penalty = 0
-        
-        # Check for various constraints and conflicts
-        for i, session1 in enumerate(schedule):
-            # Check for same faculty teaching at same time
-            for j, session2 in enumerate(schedule):
-                if i < j:
-                    if session1["timeSlot"] == session2["timeSlot"]:
-                        # Same faculty conflict
-                        if session1["facultyId"] == session2["facultyId"]:
-                            penalty += 10
-                        
-                        # Same room conflict
-                        if session1["roomId"] == session2["roomId"]:
-                            penalty += 10
-            
-            # Check for back-to-back slots for faculty (small penalty)
-            for j, session2 in enumerate(schedule):
-                if i != j and session1["facultyId"] == session2["facultyId"]:
-                    # Simple check if slots are close (not perfect but illustrative)
-                    day1, time1 = session1["timeSlot"].split(" ", 1)
-                    day2, time2 = session2["timeSlot"].split(" ", 1)
-                    
-                    if day1 == day2:
-                        # If consecutive hours, small penalty
-                        times = [time1, time2]
-                        times.sort()
-                        if times[0].split("-")[1] == times[1].split("-")[0]:
-                            penalty += 1  # Small penalty for consecutive classes
-        
-        return -penalty  # Negative because we want to maximize fitness
+    POPULATION_SIZE = min(max(20, 2 * len(initial_schedule)), 200)
+    ELITE_SIZE = max(2, POPULATION_SIZE // 6)
+    PARENT_POOL_SIZE = max(3, POPULATION_SIZE // 2)
+    TOURNAMENT_SIZE = 3
+    BASE_MUTATION_RATE = 0.1
+    MIN_MUTATION_RATE = 0.02
+    MAX_MUTATION_RATE = 0.4
+    TARGET_DIVERSITY = 0.2
+    mutation_rate = BASE_MUTATION_RATE
     
-    def mutate(schedule):
-        """Mutate the schedule by changing random time slots"""
-        mutated = schedule.copy()
-        
-        for i in range(len(mutated)):
-            if random.random() < MUTATION_RATE:
-                # Randomly reassign a timeslot
-                mutated[i] = mutated[i].copy()
-                mutated[i]["timeSlot"] = random.choice(available_slots)
+    # Encode the schedule as slot indices; slots outside available_slots are
+    # kept as-is but never chosen by mutation
+    slots = list(available_slots)
+    for session in initial_schedule:
+        if session["timeSlot"] not in slots:
+            slots.append(session["timeSlot"])
+    slot_index = {slot: idx for idx, slot in enumerate(slots)}
+    session_count = len(initial_schedule)
+    model = build_fitness_model(initial_schedule, slots, room_capacities(rooms), enrollment_counts)
+    
+    # Fit the population and the scoring batch into the memory budget
+    rows_per_batch = POPULATION_SIZE
+    degraded = False
+    if memory_limit_mb:
+        headroom = max(0.0, memory_limit_mb - current_rss_mb()) * 2 ** 20
+        # Population, ranked copy, parents and children are all P x N arrays
+        row_bytes = 5 * 8 * max(1, session_count)
+        # Each scored row gathers two int64 values per faculty/room pair
+        pair_count = len(model["faculty_first"]) + len(model["room_first"])
+        eval_row_bytes = 3 * 8 * max(1, pair_count)
         
-        return mutated
+        affordable = int(0.5 * headroom // row_bytes)
+        if affordable < POPULATION_SIZE:
+            POPULATION_SIZE = max(4, affordable)
+            ELITE_SIZE = max(2, POPULATION_SIZE // 6)
+            PARENT_POOL_SIZE = max(3, POPULATION_SIZE // 2)
+            degraded = True
+        rows_per_batch = min(POPULATION_SIZE, max(1, int(0.25 * headroom // eval_row_bytes)))
+        if degraded or rows_per_batch < POPULATION_SIZE:
+            model["soft_constraints"] = False
+            degraded = True
+            print(f"Memory budget tight: population {POPULATION_SIZE}, "
+                  f"scoring {rows_per_batch} rows per batch, soft constraints dropped")
     
-    def crossover(parent1, parent2):
-        """Crossover two parent schedules"""
-        crossover_point = random.randint(1, len(parent1) - 1)
-        child = parent1[:crossover_point] + parent2[crossover_point:]
-        return child
+    def decode(chromosome):
+        """Turn a row of slot indices back into a schedule"""
+        return [
+            {**session, "timeSlot": slots[slot]}
+            for session, slot in zip(initial_schedule, chromosome)
+        ]
     
     # Initialize population with the initial schedule and variations
-    population = [initial_schedule]
+    initial = np.array([slot_index[s["timeSlot"]] for s in initial_schedule], dtype=np.int64)
+    shape = (POPULATION_SIZE, session_count)
     
-    # Create variations for the rest of the population
-    for _ in range(POPULATION_SIZE - 1):
-        variation = initial_schedule.copy()
-        # Randomly change some time slots
-        for i in range(len(variation)):
-            if random.random() < 0.3:  # 30% chance to change
-                variation_item = variation[i].copy()
-                variation_item["timeSlot"] = random.choice(available_slots)
-                variation[i] = variation_item
-        population.append(variation)
+    pool = None
+    buffers = []
+    population = shared_scores = None
+    best_chromosome = initial.copy()
+    best_fitness = int(batch_fitness(initial[None, :], model)[0])
+    stagnant_generations = 0
+    generations_run = 0
+    termination_reason = "max_generations"
     
-    # Run the genetic algorithm
-    for generation in range(GENERATIONS):
-        # Calculate fitness for each schedule
-        fitness_scores = [fitness(schedule) for schedule in population]
+    try:
+        # Shared buffers and the pool are created inside the try so the
+        # finally below always releases them
+        if workers > 1 and session_count > 0:
+            for nbytes in (POPULATION_SIZE * session_count * 8, POPULATION_SIZE * 8):
+                buffers.append(shared_memory.SharedMemory(create=True, size=nbytes))
+            population = np.ndarray(shape, dtype=np.int64, buffer=buffers[0].buf)
+            shared_scores = np.ndarray(POPULATION_SIZE, dtype=np.int64, buffer=buffers[1].buf)
+            pool = Pool(
+                workers,
+                initializer=_init_fitness_worker,
+                initargs=(model, buffers[0].name, buffers[1].name, shape)
+            )
+            bounds = np.linspace(0, POPULATION_SIZE, workers + 1).astype(int)
+            shards = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        else:
+            population = np.empty(shape, dtype=np.int64)
         
-        # Sort population by fitness
-        sorted_population = [x for _, x in sorted(zip(fitness_scores, population), key=lambda pair: pair[0], reverse=True)]
+        def evaluate():
+            if pool is None:
+                return np.concatenate([
+                    batch_fitness(population[start:start + rows_per_batch], model)
+                    for start in range(0, POPULATION_SIZE, rows_per_batch)
+                ])
+            pool.map(_score_shard, shards)
+            return shared_scores.copy()
         
-        # Keep best schedules
-        new_population = sorted_population[:5]  # Elitism - keep top 5
+        population[:] = initial
+        # Randomly change some time slots (30% chance) in all but the first
+        variation_mask = rng.random((POPULATION_SIZE - 1, session_count)) < 0.3
+        population[1:][variation_mask] = rng.integers(0, len(available_slots), size=variation_mask.sum())
         
-        # Create new generation
-        while len(new_population) < POPULATION_SIZE:
-            # Tournament selection
-            tournament_size = 3
-            tournament = random.sample(sorted_population[:15], tournament_size)
-            parent1 = tournament[0]
+        # Run the genetic algorithm
+        for generation in range(max_generations):
+            # Score and rank the whole population at once
+            fitness_scores = evaluate()
+            order = np.argsort(-fitness_scores, kind="stable")
+            generations_run = generation + 1
+            
+            # Track the best schedule seen so far
+            generation_best = int(fitness_scores[order[0]])
+            if generation_best > best_fitness:
+                best_fitness = generation_best
+                best_chromosome = population[order[0]].copy()
+                stagnant_generations = 0
+            else:
+                stagnant_generations += 1
+            
+            # Check termination conditions
+            if -best_fitness <= target_penalty:
+                termination_reason = "target_penalty"
+                break
+            if stagnant_generations >= stagnation_limit:
+                termination_reason = "stagnation"
+                break
+            if time_limit is not None and time.monotonic() - start_time >= time_limit:
+                termination_reason = "time_limit"
+                break
+            if memory_limit_mb and current_rss_mb() >= 0.95 * memory_limit_mb:
+                termination_reason = "memory_limit"
+                break
+            
+            # Raise mutation when the population collapses, relax it when diverse
+            current_diversity = np.mean(population != population[order[0]]) if session_count else 0.0
+            mutation_rate = BASE_MUTATION_RATE * TARGET_DIVERSITY / max(current_diversity, 1e-3)
+            mutation_rate = min(max(mutation_rate, MIN_MUTATION_RATE), MAX_MUTATION_RATE)
+            
+            ranked = population[order]
+            child_count = POPULATION_SIZE - ELITE_SIZE
+            
+            # Tournament selection from the fittest part of the population
+            pool_size = min(PARENT_POOL_SIZE, POPULATION_SIZE)
+            parents1 = ranked[rng.integers(0, pool_size, size=(child_count, TOURNAMENT_SIZE)).min(axis=1)]
+            parents2 = ranked[rng.integers(0, pool_size, size=(child_count, TOURNAMENT_SIZE)).min(axis=1)]
+            
+            # One-point crossover
+            if session_count > 1:
+                points = rng.integers(1, session_count, size=child_count)
+                children = np.where(np.arange(session_count) < points[:, None], parents1, parents2)
+            else:
+                children = parents1.copy()
+            
+            # Mutation: randomly reassign time slots
+            mutation_mask = rng.random(children.shape) < mutation_rate
+            children[mutation_mask] = rng.integers(0, len(available_slots), size=mutation_mask.sum())
             
-            tournament = random.sample(sorted_population[:15], tournament_size)
-            parent2 = tournament[0]
+            # Elitism - keep the best schedules unchanged
+            population[:ELITE_SIZE] = ranked[:ELITE_SIZE]
+            population[ELITE_SIZE:] = children
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        # Drop the views before releasing the shared buffers
+        population = shared_scores = None
+        for buffer in buffers:
+            buffer.close()
+            buffer.unlink()
+    
+    optimization_info = {
+        "generations": generations_run,
+        "terminationReason": termination_reason,
+        "populationSize": POPULATION_SIZE,
+        "memoryDegraded": degraded,
+        "bestPenalty": -best_fitness,
+        "capacityViolations": model["capacity_violations"],
+        "finalMutationRate": round(float(mutation_rate), 4)
+    }
+    print(f"GA finished: {optimization_info}")
+    
+    return decode(best_chromosome), optimization_info
+
+def build_conflict_index(timetable):
+    """
+    Index timetable entries by resource and by occupied slot
+    
+    Args:
+        timetable: List of timetable entries
+    
+    Returns:
+        Tuple of (by_resource, occupancy) where by_resource maps
+        ("faculty"|"room"|"course", id) to entry indices and occupancy maps
+        (kind, id, timeSlot) to the set of entry indices using it
+    """
+    by_resource = {}
+    occupancy = {}
+    for idx, entry in enumerate(timetable):
+        for kind, key in (("faculty", "facultyId"), ("room", "roomId"), ("course", "courseId")):
+            resource_id = entry.get(key)
+            by_resource.setdefault((kind, resource_id), []).append(idx)
+            occupancy.setdefault((kind, resource_id, entry.get("timeSlot")), set()).add(idx)
+    return by_resource, occupancy
+
+def evaluate_scenario(input_data):
+    """
+    Apply what-if deltas to an existing timetable and repair it locally
+    
+    Only sessions touched by a delta are rescheduled; every other entry
+    keeps its slot, room and faculty. Affected sessions are placed greedily,
+    preferring their original slot, room and faculty, using the conflict
+    index to avoid faculty, room and student clashes.
+    
+    Args:
+        input_data: Dictionary containing:
+            - scenario: Dictionary with
+                - baseTimetable: List of timetable entries to start from
+                - deltas: List of changes, each one of
+                    {"type": "removeRoom", "roomId": ...}
+                    {"type": "removeFaculty", "facultyId": ...}
+                    {"type": "unavailable", "roomId" and/or "facultyId": ...,
+                     "day": ..., "times": optional list of "9:00-10:00" ranges}
+                    {"type": "addSession", "session": {"courseId", "facultyId",
+                     optional "roomId", "type"}}
+            - courses, faculty, rooms, students: Optional resource data; rooms
+              and faculty default to those found in the base timetable
+    
+    Returns:
+        Dictionary with the changed entries, any sessions that could not be
+        placed, and the checks skipped for lack of students or rooms data
+    """
+    try:
+        scenario = input_data['scenario']
+        timetable = [dict(entry) for entry in scenario.get('baseTimetable', [])]
+        deltas = scenario.get('deltas', [])
+        
+        courses_data = input_data.get('courses', [])
+        faculty_data = input_data.get('faculty', [])
+        rooms_data = input_data.get('rooms', [])
+        enrollment_counts = build_enrollment_index(input_data.get('students', []))
+        
+        # Define available time slots
+        days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+        time_slots = ["9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00", "14:00-15:00", "15:00-16:00"]
+        available_slots = [f"{day} {slot}" for day in days for slot in time_slots]
+        for entry in timetable:
+            if entry.get("timeSlot") and entry["timeSlot"] not in available_slots:
+                available_slots.append(entry["timeSlot"])
+        
+        # Resources, falling back to what the base timetable uses
+        room_ids = [room.get('id') for room in rooms_data] or list(dict.fromkeys(
+            entry.get("roomId") for entry in timetable if entry.get("roomId")))
+        faculty_ids = [member.get('id') for member in faculty_data] or list(dict.fromkeys(
+            entry.get("facultyId") for entry in timetable if entry.get("facultyId")))
+        capacities = room_capacities(pd.DataFrame(rooms_data))
+        room_types = {room.get('id'): room.get('type', "Lecture") for room in rooms_data}
+        room_names = {room.get('id'): room.get('name', f"Room {room.get('id')}") for room in rooms_data}
+        faculty_names = {member.get('id'): member.get('name', "Unknown Faculty") for member in faculty_data}
+        course_names = {course.get('id'): course.get('name', "Unknown Course") for course in courses_data}
+        
+        # Courses that share at least one student must not overlap
+        course_conflicts = {}
+        for student in input_data.get('students', []):
+            enrolled = set(student.get('enrolledCourses', []))
+            for course_id in enrolled:
+                course_conflicts.setdefault(course_id, set()).update(enrolled - {course_id})
+        
+        by_resource, occupancy = build_conflict_index(timetable)
+        
+        # Translate deltas into removed resources, blocked slots and the set
+        # of entries that need to be placed again
+        removed = set()
+        blocked = set()
+        affected = set()
+        for delta in deltas:
+            delta_type = delta.get('type')
+            if delta_type in ("removeRoom", "removeFaculty"):
+                kind = "room" if delta_type == "removeRoom" else "faculty"
+                resource_id = delta.get('roomId' if kind == "room" else 'facultyId')
+                removed.add((kind, resource_id))
+                affected.update(by_resource.get((kind, resource_id), []))
+            elif delta_type == "unavailable":
+                # A delta may name a room, a faculty member or both; block each
+                resources = [(kind, delta.get(key)) for kind, key in (("room", 'roomId'), ("faculty", 'facultyId'))
+                             if delta.get(key)]
+                if not resources:
+                    raise ValueError("An unavailable delta needs a roomId or facultyId")
+                times = delta.get('times')
+                for slot in available_slots:
+                    day, slot_time = slot.split(" ", 1)
+                    if day == delta.get('day') and (not times or slot_time in times):
+                        for kind, resource_id in resources:
+                            blocked.add((kind, resource_id, slot))
+                            affected.update(occupancy.get((kind, resource_id, slot), set()))
+            elif delta_type == "addSession":
+                session = delta.get('session', {})
+                course_id = session.get('courseId', '')
+                timetable.append({
+                    "courseId": course_id,
+                    "courseName": session.get('courseName') or course_names.get(course_id, "Unknown Course"),
+                    "timeSlot": None,
+                    "facultyId": session.get('facultyId'),
+                    "facultyName": faculty_names.get(session.get('facultyId'), ""),
+                    "roomId": session.get('roomId'),
+                    "roomName": room_names.get(session.get('roomId'), ""),
+                    "type": session.get('type', "Lecture")
+                })
+                affected.add(len(timetable) - 1)
+            else:
+                raise ValueError(f"Unknown scenario delta type: {delta_type}")
+        
+        base_count = len(scenario.get('baseTimetable', []))
+        originals = {idx: dict(timetable[idx]) for idx in affected}
+        
+        # Take affected sessions out of the index before re-placing them
+        for idx in affected:
+            entry = timetable[idx]
+            for kind, key in (("faculty", "facultyId"), ("room", "roomId"), ("course", "courseId")):
+                occupancy.get((kind, entry.get(key), entry.get("timeSlot")), set()).discard(idx)
+        
+        def is_free(kind, resource_id, slot):
+            return (
+                (kind, resource_id) not in removed
+                and (kind, resource_id, slot) not in blocked
+                and not occupancy.get((kind, resource_id, slot))
+            )
+        
+        def room_cost(room_id, entry):
+            # Wrong room type or too few seats make a room less attractive
+            cost = 0
+            if room_types and room_types.get(room_id, "Lecture") != (entry.get("type") or "Lecture"):
+                cost += 3
+            if enrollment_counts.get(entry.get("courseId"), 0) > capacities.get(room_id, float("inf")):
+                cost += 5
+            return cost
+        
+        def place(entry):
+            """Find the cheapest (cost, slot, room, faculty) for an entry"""
+            best = None
+            course_id = entry.get("courseId")
+            for slot in available_slots:
+                cost = 0 if slot == entry.get("timeSlot") else 1
+                
+                # Students of this course already busy in this slot
+                clashes = sum(
+                    1 for other in course_conflicts.get(course_id, ())
+                    if occupancy.get(("course", other, slot))
+                )
+                if occupancy.get(("course", course_id, slot)):
+                    clashes += 1
+                cost += 20 * clashes
+                if best is not None and cost >= best[0]:
+                    continue
+                
+                faculty_id = entry.get("facultyId")
+                if not is_free("faculty", faculty_id, slot):
+                    if ("faculty", faculty_id) not in removed:
+                        continue
+                    # Substitute any free faculty member for a removed one
+                    substitutes = [f for f in faculty_ids if is_free("faculty", f, slot)]
+                    if not substitutes:
+                        continue
+                    faculty_id = substitutes[0]
+                    cost += 2
+                
+                room_id = entry.get("roomId")
+                if room_id and is_free("room", room_id, slot):
+                    cost += room_cost(room_id, entry)
+                else:
+                    free_rooms = [r for r in room_ids if is_free("room", r, slot)]
+                    if not free_rooms:
+                        continue
+                    room_id = min(free_rooms, key=lambda r: room_cost(r, entry))
+                    cost += 1 + room_cost(room_id, entry)
+                
+                if best is None or cost < best[0]:
+                    best = (cost, slot, room_id, faculty_id)
+            return best
+        
+        changes = []
+        unresolved = []
+        for idx in sorted(affected):
+            entry = timetable[idx]
+            placement = place(entry)
+            if placement is None:
+                unresolved.append({
+                    "index": idx if idx < base_count else None,
+                    "entry": originals[idx],
+                    "reason": "No free slot, room and faculty combination"
+                })
+                continue
             
-            # Create child through crossover and mutation
-            child = crossover(parent1, parent2)
-            child = mutate(child)
+            _, slot, room_id, faculty_id = placement
+            entry["timeSlot"] = slot
+            if room_id != entry.get("roomId"):
+                entry["roomId"] = room_id
+                entry["roomName"] = room_names.get(room_id, f"Room {room_id}")
+            if faculty_id != entry.get("facultyId"):
+                entry["facultyId"] = faculty_id
+                entry["facultyName"] = faculty_names.get(faculty_id, "Unknown Faculty")
+            for kind, key in (("faculty", "facultyId"), ("room", "roomId"), ("course", "courseId")):
+                occupancy.setdefault((kind, entry.get(key), slot), set()).add(idx)
             
-            new_population.append(child)
+            if idx >= base_count:
+                changes.append({"index": None, "action": "added", "before": None, "after": entry})
+            elif entry != originals[idx]:
+                changes.append({"index": idx, "action": "updated", "before": originals[idx], "after": entry})
+        
+        # Checks that could not run because the caller sent no data for them
+        skipped_checks = []
+        if not input_data.get('students'):
+            skipped_checks.append("studentClashes")
+        if not capacities or not enrollment_counts:
+            skipped_checks.append("roomCapacity")
+        if not room_types:
+            skipped_checks.append("roomType")
+        
+        message = f"Scenario evaluated: {len(changes)} entries changed, {len(unresolved)} unresolved"
+        if skipped_checks:
+            message += f" (skipped checks: {', '.join(skipped_checks)})"
         
-        population = new_population
+        return {
+            "status": "success",
+            "message": message,
+            "skippedChecks": skipped_checks,
+            "affectedSessions": len(affected),
+            "changes": changes,
+            "unresolved": unresolved
+        }
+    
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error evaluating scenario: {str(e)}"
+        }
+
+def build_timetable_index(timetable, rooms_data, students):
+    """
+    Build secondary indexes over a finished timetable for per-entity views
     
-    # Return the best schedule from the final population
-    fitness_scores = [fitness(schedule) for schedule in population]
-    best_schedule_idx = fitness_scores.index(max(fitness_scores))
+    Args:
+        timetable: List of timetable entries
+        rooms_data: List of rooms
+        students: List of students with their enrolled courses
     
-    return population[best_schedule_idx]
+    Returns:
+        Dictionary with:
+            - slots: Ordered list of time slots used by the bitmaps
+            - byFaculty, byRoom, byCourse, bySlot, byStudent: Mappings from
+              ID (or time slot) to the indices of matching timetable entries
+            - freeSlotBitmaps: Per room, a string with one character per
+              slot in 'slots', '1' where the room is free
+    """
+    # Define available time slots
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+    time_slots = ["9:00-10:00", "10:00-11:00", "11:00-12:00", "12:00-13:00", "14:00-15:00", "15:00-16:00"]
+    slots = [f"{day} {slot}" for day in days for slot in time_slots]
+    for entry in timetable:
+        if entry.get("timeSlot") and entry["timeSlot"] not in slots:
+            slots.append(entry["timeSlot"])
+    slot_position = {slot: position for position, slot in enumerate(slots)}
+    
+    index = {
+        "slots": slots,
+        "byFaculty": {},
+        "byRoom": {},
+        "byCourse": {},
+        "bySlot": {},
+        "byStudent": {},
+        "freeSlotBitmaps": {}
+    }
+    for idx, entry in enumerate(timetable):
+        for name, key in (("byFaculty", "facultyId"), ("byRoom", "roomId"),
+                          ("byCourse", "courseId"), ("bySlot", "timeSlot")):
+            if entry.get(key):
+                index[name].setdefault(entry[key], []).append(idx)
+    
+    for student in students:
+        entries = []
+        for course_id in student.get('enrolledCourses', []):
+            entries.extend(index["byCourse"].get(course_id, []))
+        if student.get('id'):
+            index["byStudent"][student['id']] = sorted(set(entries))
+    
+    room_ids = [room.get('id') for room in rooms_data if room.get('id')]
+    for room_id in list(dict.fromkeys(room_ids + list(index["byRoom"]))):
+        bits = ["1"] * len(slots)
+        for idx in index["byRoom"].get(room_id, []):
+            position = slot_position.get(timetable[idx].get("timeSlot"))
+            if position is None:
+                # Unscheduled entries do not occupy any slot
+                continue
+            bits[position] = "0"
+        index["freeSlotBitmaps"][room_id] = "".join(bits)
+    
+    return index
 
 # Parse CSV data and convert to format needed for timetable generation
 def parse_csv_data(csv_data):
@@ -606,13 +1497,13 @@ def parse_csv_data(csv_data):
         # Extract headers
         headers = [h.strip() for h in lines[0].split(',')]
         
-        # Parse data rows
+        # Parse data rows (csv handles quoted fields such as enrollment lists)
         data = []
         for line in lines[1:]:
             if not line.strip():
                 continue
                 
-            values = [v.strip() for v in line.split(',')]
+            values = [v.strip() for v in next(csv.reader([line]))]
             if len(values) != len(headers):
                 # Skip rows with wrong number of columns
                 print(f"Warning: Skipping row with incorrect number of columns: {line}")
@@ -731,31 +1622,44 @@ def parse_csv_data(csv_data):
 # Script execution entry point
 if __name__ == "__main__":
     try:
-        # Redirect standard output to save debug prints
-        import io
-        import sys
+        # Redirect standard output to save debug prints, either to a rotating
+        # file or to a size-capped in-memory buffer
         original_stdout = sys.stdout
-        debug_output = io.StringIO()
+        debug_log_path = os.environ.get("TIMETABLE_DEBUG_LOG")
+        if debug_log_path:
+            max_bytes = int(os.environ.get("TIMETABLE_DEBUG_LOG_MAX_BYTES", 1024 * 1024))
+            debug_output = RotatingDebugLog(debug_log_path, max_bytes)
+        else:
+            debug_output = BoundedDebugLog(int(os.environ.get("TIMETABLE_DEBUG_MAX_CHARS", 64 * 1024)))
         sys.stdout = debug_output
         
-        # Read input data from stdin (sent by Node.js)
-        input_str = ""
-        for line in sys.stdin:
-            input_str += line
-        
-        # Parse the JSON input
-        input_data = json.loads(input_str)
+        # Parse the JSON input from stdin (sent by Node.js) incrementally
+        input_data = load_json_stream(sys.stdin)
         
         # Check if we received CSV data
         if 'csvData' in input_data:
-            # Parse CSV data and convert to structured format
-            processed_data = parse_csv_data(input_data['csvData'])
+            # Parse CSV data and convert to structured format, keeping the
+            # other top-level options (seed, GA limits, scenario, ...)
+            processed_data = parse_csv_data(input_data.pop('csvData'))
+            for key, value in input_data.items():
+                processed_data.setdefault(key, value)
         else:
             # Use the input data directly
             processed_data = input_data
         
-        # If no valid input is provided, use test data
-        if not processed_data['courses'] or not processed_data['faculty'] or not processed_data['rooms']:
+        # The process-wide memory budget is a ceiling; a request may only lower it
+        if os.environ.get("TIMETABLE_MEMORY_LIMIT_MB"):
+            env_limit = float(os.environ["TIMETABLE_MEMORY_LIMIT_MB"])
+            if processed_data.get('memory_limit_mb'):
+                processed_data['memory_limit_mb'] = min(env_limit, float(processed_data['memory_limit_mb']))
+            else:
+                processed_data['memory_limit_mb'] = env_limit
+        
+        # Scenarios only need a base timetable; otherwise, if no valid input
+        # is provided, use test data
+        if processed_data.get('scenario'):
+            result = generate_timetable(processed_data)
+        elif not processed_data['courses'] or not processed_data['faculty'] or not processed_data['rooms']:
             test_data = {
                 "courses": [
                     {"id": "CS101", "name": "Introduction to Computer Science", "lectureCount": 3, "hasLab": True, "labCount": 1},